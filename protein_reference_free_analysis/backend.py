@@ -0,0 +1,102 @@
+"""Pluggable array backends.
+
+Two backends are supported:
+
+- `"jax"`: arrays are `jax.numpy` arrays and the one-hot design matrix is dense.
+- `"numpy"`: arrays are NumPy arrays and the one-hot design matrix
+  is a `scipy.sparse` CSR matrix.
+
+The backend can be chosen globally:
+
+```python
+from protein_reference_free_analysis.backend import set_backend
+
+set_backend("numpy")
+```
+
+or per call, by passing `backend="numpy"` (or `"jax"`)
+to any function that accepts a `backend` keyword argument.
+JAX is only imported when the `"jax"` backend is first used.
+"""
+from types import ModuleType
+from typing import Optional
+
+import numpy as np
+
+BACKENDS = ("jax", "numpy")
+
+_default_backend = "jax"
+
+
+def set_backend(backend: str) -> None:
+    """Set the global default backend.
+
+    :param backend: One of `BACKENDS`.
+    """
+    global _default_backend
+    _default_backend = resolve_backend(backend)
+
+
+def get_backend() -> str:
+    """Get the global default backend.
+
+    :returns: The name of the global default backend.
+    """
+    return _default_backend
+
+
+def resolve_backend(backend: Optional[str] = None) -> str:
+    """Resolve a backend name, falling back to the global default.
+
+    :param backend: One of `BACKENDS`, or None to use the global default.
+    :returns: The name of the backend to use.
+    :raises ValueError: If `backend` is not one of `BACKENDS`.
+    """
+    if backend is None:
+        return _default_backend
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}.")
+    return backend
+
+
+def array_module(backend: Optional[str] = None) -> ModuleType:
+    """Get the array module for a backend.
+
+    :param backend: One of `BACKENDS`, or None to use the global default.
+    :returns: `numpy` or `jax.numpy`.
+    """
+    if resolve_backend(backend) == "jax":
+        import jax.numpy as jnp
+
+        return jnp
+    return np
+
+
+def asarray(x, backend: Optional[str] = None):
+    """Convert `x` into an array of the given backend.
+
+    :param x: An array-like.
+    :param backend: One of `BACKENDS`, or None to use the global default.
+    :returns: `x` as an array of the backend.
+    """
+    return array_module(backend).asarray(x)
+
+
+def design_matrix(genotypes, backend: Optional[str] = None):
+    """Flatten a one-hot genotype tensor into a 2D design matrix.
+
+    :param genotypes: The one-hot genotype matrix.
+        Should be of shape (num_genotypes, num_sites, num_states).
+    :param backend: One of `BACKENDS`, or None to use the global default.
+    :returns: The design matrix of shape (num_genotypes, num_sites * num_states).
+        It is a `scipy.sparse.csr_matrix` for the `"numpy"` backend
+        and a dense `jax.numpy` array for the `"jax"` backend.
+    """
+    num_genotypes, num_sites, num_states = genotypes.shape
+    shape = (num_genotypes, num_sites * num_states)
+    if resolve_backend(backend) == "jax":
+        return asarray(genotypes, "jax").reshape(shape)
+
+    from scipy import sparse
+
+    return sparse.csr_matrix(np.asarray(genotypes).reshape(shape))
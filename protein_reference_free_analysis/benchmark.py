@@ -0,0 +1,122 @@
+"""Benchmark harness for comparing array backends.
+
+Usage example:
+
+```python
+from protein_reference_free_analysis.benchmark import benchmark_backends
+
+results = benchmark_backends(num_sites=[2, 4, 6], num_states=3)
+```
+
+or, from the command line:
+
+```bash
+protein-reference-free-analysis benchmark --num-sites 2 --num-sites 4 --num-sites 6 --num-states 3
+```
+"""
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .backend import BACKENDS
+from .cache import use_cache
+from .effects import first_order_effects, second_order_effects, zeroth_order_effects
+from .genotype_generator import make_comprehensive_genotypes
+
+ESTIMATORS: Dict[str, Callable] = {
+    "zeroth_order_effects": zeroth_order_effects,
+    "first_order_effects": first_order_effects,
+    "second_order_effects": second_order_effects,
+}
+
+
+def _block(x):
+    """Wait until `x` has been computed.
+
+    JAX dispatches asynchronously, so timings must block on the result.
+
+    :param x: The result of an estimator.
+    :returns: `x`.
+    """
+    if hasattr(x, "block_until_ready"):
+        x.block_until_ready()
+    return x
+
+
+def time_estimator(estimator: Callable, *args, repeats: int = 3, **kwargs) -> float:
+    """Time an estimator, returning the best wall-clock time of `repeats` runs.
+
+    :param estimator: The estimator to time.
+    :param args: Positional arguments for `estimator`.
+    :param repeats: The number of timed runs.
+    :param kwargs: Keyword arguments for `estimator`.
+    :returns: The best wall-clock time in seconds.
+    """
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        _block(estimator(*args, **kwargs))
+        timings.append(perf_counter() - start)
+    return min(timings)
+
+
+def benchmark_backends(
+    num_sites: Iterable[int],
+    num_states: int,
+    backends: Iterable[str] = BACKENDS,
+    estimators: Optional[Iterable[str]] = None,
+    repeats: int = 3,
+    seed: int = 0,
+) -> List[dict]:
+    """Benchmark each estimator on each backend over a range of library sizes.
+
+    Comprehensive genotype libraries are used,
+    so the number of genotypes is `num_states ** num_sites`.
+    Caching is disabled while benchmarking.
+
+    :param num_sites: The numbers of sites to benchmark.
+    :param num_states: The number of states per site.
+    :param backends: The backends to benchmark.
+    :param estimators: The names of the estimators in `ESTIMATORS` to benchmark.
+        Defaults to all of them.
+    :param repeats: The number of timed runs per measurement.
+    :param seed: The seed for the random phenotypes.
+    :returns: One record per (num_sites, estimator, backend),
+        with the best time in seconds and whether that backend was the fastest.
+    """
+    estimators = list(ESTIMATORS if estimators is None else estimators)
+    backends = list(backends)
+    rng = np.random.default_rng(seed)
+    records = []
+    # Caching would make every repeat after the first a lookup.
+    with use_cache(None):
+        for sites in num_sites:
+            genotypes = make_comprehensive_genotypes(sites, num_states, backend="numpy")
+            phenotypes = rng.normal(size=len(genotypes))
+            for name in estimators:
+                timings = {}
+                for backend in backends:
+                    # Warm up once so that JAX's compilation is not timed.
+                    _block(ESTIMATORS[name](genotypes, phenotypes, backend=backend))
+                    timings[backend] = time_estimator(
+                        ESTIMATORS[name],
+                        genotypes,
+                        phenotypes,
+                        backend=backend,
+                        repeats=repeats,
+                    )
+                fastest = min(timings, key=timings.get)
+                for backend, seconds in timings.items():
+                    records.append(
+                        {
+                            "num_sites": sites,
+                            "num_states": num_states,
+                            "num_genotypes": len(genotypes),
+                            "estimator": name,
+                            "backend": backend,
+                            "seconds": seconds,
+                            "fastest": backend == fastest,
+                        }
+                    )
+    return records
@@ -0,0 +1,281 @@
+"""Content-addressed cache for sufficient statistics and effect tensors.
+
+Results are keyed by a fingerprint of the genotype and phenotype arrays
+together with the estimator options (backend, precision, ...),
+so repeated calls on the same library return without recomputation.
+
+The cache keeps entries in memory with least-recently-used eviction
+and, when given a directory, also stores them on disk
+so that they can be reused across processes:
+
+```python
+from protein_reference_free_analysis.cache import EffectCache, set_cache
+
+set_cache(EffectCache(max_memory="4GB", directory="~/.cache/prfa"))
+```
+
+Caching is on by default, with a 1GB in-memory tier.
+Pass `cache=False` to an estimator to bypass the cache for one call,
+or `set_cache(None)` to disable caching globally.
+
+Every cached call fingerprints the full genotype tensor,
+which costs time (and, for JAX arrays, a copy to the host) even on a hit.
+Fingerprints of JAX arrays, which cannot change, are remembered per array object;
+NumPy arrays are hashed on every call.
+
+Calls with a `max_memory` budget do not use the global cache,
+because neither its entries nor fingerprinting count against the budget.
+An `EffectCache` passed explicitly is still used, on top of the budget.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import weakref
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from .utils import parse_memory
+
+# Bump when the meaning of cached values changes, to invalidate on-disk entries.
+_CACHE_VERSION = 1
+
+# On-disk entries are named `<prefix><key>.npz`;
+# only files matching this pattern are ever removed.
+_FILE_PREFIX = "prfa-effects-"
+_FILE_PATTERN = re.compile(re.escape(_FILE_PREFIX) + r"[0-9a-f]{40}\.npz")
+
+# Digests of JAX arrays, by id, with a weak reference to the array.
+_array_digests = {}
+
+
+def _is_immutable(array) -> bool:
+    """Check whether an array's content can never change.
+
+    NumPy arrays never qualify: even a read-only array can be made writable again,
+    or be changed through a view.
+
+    :param array: An array.
+    :returns: True for JAX arrays.
+    """
+    return type(array).__module__.startswith(("jax", "jaxlib"))
+
+
+def _array_digest(array) -> bytes:
+    """Hash an array's dtype, shape and content.
+
+    Digests of JAX arrays are remembered for as long as the array lives.
+
+    :param array: An array.
+    :returns: The digest.
+    """
+    remembered = _array_digests.get(id(array))
+    if remembered is not None and remembered[0]() is array:
+        return remembered[1]
+
+    contiguous = np.ascontiguousarray(np.asarray(array))
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr((contiguous.dtype.str, contiguous.shape)).encode())
+    digest.update(contiguous.data)
+    digest = digest.digest()
+
+    if _is_immutable(array):
+        key = id(array)
+        try:
+            ref = weakref.ref(array, lambda _: _array_digests.pop(key, None))
+        except TypeError:
+            return digest
+        _array_digests[key] = (ref, digest)
+    return digest
+
+
+def fingerprint(*arrays, **options) -> str:
+    """Fingerprint arrays and options by their content.
+
+    :param arrays: The arrays to fingerprint.
+    :param options: Options that change the value being cached.
+    :returns: A hex digest.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr(_CACHE_VERSION).encode())
+    for array in arrays:
+        digest.update(_array_digest(array))
+    digest.update(repr(sorted(options.items())).encode())
+    return digest.hexdigest()
+
+
+class EffectCache:
+    """An LRU cache of arrays in memory with an optional on-disk tier.
+
+    Each entry is a tuple of NumPy arrays.
+    Entries are copied on the way in and out,
+    so mutating a returned array does not corrupt the cache.
+
+    :param max_memory: The memory budget of the in-memory tier;
+        see `protein_reference_free_analysis.utils.parse_memory`.
+        None means unbounded.
+    :param directory: The directory of the on-disk tier, or None for no disk tier.
+    """
+
+    def __init__(
+        self,
+        max_memory: Union[None, int, str] = "1GB",
+        directory: Union[None, str, Path] = None,
+    ):
+        self.max_memory = parse_memory(max_memory)
+        self.directory = None
+        if directory is not None:
+            self.directory = Path(directory).expanduser()
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._entries = OrderedDict()
+        self.nbytes = 0
+
+    def __len__(self) -> int:
+        """Count the entries held in memory.
+
+        :returns: The number of entries held in memory.
+        """
+        return len(self._entries)
+
+    def __contains__(self, key: str) -> bool:
+        """Check whether an entry is held in memory or on disk.
+
+        :param key: The key of the entry.
+        :returns: Whether the entry is cached.
+        """
+        return key in self._entries or (
+            self.directory is not None and self._path(key).exists()
+        )
+
+    def _path(self, key: str) -> Path:
+        """Get the on-disk path of an entry.
+
+        :param key: The key of the entry.
+        :returns: The path of the entry's `.npz` file.
+        """
+        return self.directory / f"{_FILE_PREFIX}{key}.npz"
+
+    def get(self, key: str) -> Optional[Tuple[np.ndarray, ...]]:
+        """Get an entry, promoting on-disk entries into memory.
+
+        :param key: The key of the entry.
+        :returns: A copy of the cached arrays, or None on a miss.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return tuple(np.array(array) for array in self._entries[key])
+        if self.directory is None or not self._path(key).exists():
+            return None
+        with np.load(self._path(key)) as data:
+            arrays = tuple(data[f"arr_{i}"] for i in range(len(data.files)))
+        self._remember(key, arrays)
+        return tuple(np.array(array) for array in arrays)
+
+    def put(self, key: str, arrays: Tuple[np.ndarray, ...]) -> None:
+        """Store an entry in memory and, if configured, on disk.
+
+        :param key: The key of the entry.
+        :param arrays: The arrays to store.
+        """
+        arrays = tuple(np.array(array) for array in arrays)
+        self._remember(key, arrays)
+        if self.directory is not None:
+            # Write to a temporary file first so that readers never see partial files.
+            fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.savez(f, *arrays)
+                os.replace(tmp, self._path(key))
+            except BaseException:
+                os.unlink(tmp)
+                raise
+
+    def _remember(self, key: str, arrays: Tuple[np.ndarray, ...]) -> None:
+        """Hold an entry in memory, evicting least-recently-used entries.
+
+        Entries larger than the whole memory budget are not held in memory.
+
+        :param key: The key of the entry.
+        :param arrays: The arrays to hold.
+        """
+        nbytes = sum(array.nbytes for array in arrays)
+        if self.max_memory is not None and nbytes > self.max_memory:
+            return
+        if key in self._entries:
+            self.nbytes -= sum(array.nbytes for array in self._entries.pop(key))
+        self._entries[key] = arrays
+        self.nbytes += nbytes
+        while self.max_memory is not None and self.nbytes > self.max_memory:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= sum(array.nbytes for array in evicted)
+
+    def clear(self, disk: bool = False) -> None:
+        """Remove all entries held in memory.
+
+        :param disk: Whether to also remove the on-disk entries.
+            Other files in the directory are left alone.
+        """
+        self._entries.clear()
+        self.nbytes = 0
+        if disk and self.directory is not None:
+            for path in self.directory.glob(f"{_FILE_PREFIX}*.npz"):
+                if _FILE_PATTERN.fullmatch(path.name):
+                    path.unlink()
+
+
+_default_cache: Optional[EffectCache] = EffectCache()
+
+
+def set_cache(cache: Optional[EffectCache]) -> None:
+    """Set the global default cache.
+
+    :param cache: The cache to use, or None to disable caching.
+    """
+    global _default_cache
+    _default_cache = cache
+
+
+def get_cache() -> Optional[EffectCache]:
+    """Get the global default cache.
+
+    :returns: The global default cache, or None if caching is disabled.
+    """
+    return _default_cache
+
+
+def resolve_cache(
+    cache: Union[None, bool, EffectCache] = None,
+    max_memory: Union[None, int, str] = None,
+) -> Optional[EffectCache]:
+    """Resolve the cache to use for a call.
+
+    :param cache: An `EffectCache`, False to disable caching,
+        or None to use the global default.
+    :param max_memory: The memory budget of the call, if any.
+        The global default cache is not used under a budget.
+    :returns: The cache to use, or None if caching is disabled.
+    """
+    if cache is None or cache is True:
+        return _default_cache if max_memory is None else None
+    if cache is False:
+        return None
+    return cache
+
+
+@contextmanager
+def use_cache(cache: Optional[EffectCache]):
+    """Temporarily set the global default cache.
+
+    :param cache: The cache to use, or None to disable caching.
+    :yields: The cache.
+    """
+    previous = get_cache()
+    set_cache(cache)
+    try:
+        yield cache
+    finally:
+        set_cache(previous)
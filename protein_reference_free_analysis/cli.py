@@ -10,6 +10,8 @@ Typer's docs can be found at:
     https://typer.tiangolo.com
 """
 
+from typing import List
+
 import typer
 
 app = typer.Typer()
@@ -30,5 +32,24 @@ def describe():
     )
 
 
+@app.command()
+def benchmark(
+    num_sites: List[int] = typer.Option([2, 4, 6], help="Numbers of sites; repeat the option for each."),
+    num_states: int = typer.Option(3, help="Number of states per site."),
+    repeats: int = typer.Option(3, help="Number of timed runs per measurement."),
+):
+    """Compare the speed of the array backends at different library sizes."""
+    from .benchmark import benchmark_backends
+
+    records = benchmark_backends(num_sites, num_states, repeats=repeats)
+    typer.echo(f"{'genotypes':>10} {'estimator':<22} {'backend':<8} {'seconds':>10}")
+    for record in records:
+        marker = " *" if record["fastest"] else ""
+        typer.echo(
+            f"{record['num_genotypes']:>10} {record['estimator']:<22} "
+            f"{record['backend']:<8} {record['seconds']:>10.4f}{marker}"
+        )
+
+
 if __name__ == "__main__":
     app()
@@ -1,22 +1,26 @@
 """Functions that generate a genotype matrix."""
+from typing import Optional
 
-from itertools import product
+import numpy as np
 
-import jax.numpy as np
+from .backend import asarray
 
 
-def make_comprehensive_genotypes(num_sites: int, num_states: int) -> np.ndarray:
+def make_comprehensive_genotypes(
+    num_sites: int, num_states: int, backend: Optional[str] = None
+) -> np.ndarray:
     """Make a comprehensive genotype matrix.
 
+    Genotypes are enumerated in the same order as
+    `itertools.product(range(num_states), repeat=num_sites)`.
+
     :param num_states: The number of genotype states desired.
     :param num_sites: The number of genotype positions desired.
+    :param backend: One of `BACKENDS`, or None to use the global default.
     :return: A comprehensive genotype matrix of all possible genotypes.
     """
     states = np.eye(num_states, dtype=np.int8)
-    genotypes = []
-    for genotype in product(range(num_states), repeat=num_sites):
-        genotype = np.array([states[position] for position in genotype])
-        genotypes.append(genotype)
-    genotypes = np.array(genotypes)
+    state_indices = np.indices((num_states,) * num_sites).reshape(num_sites, -1).T
+    genotypes = states[state_indices]
 
-    return genotypes
+    return asarray(genotypes, backend)
@@ -1,10 +1,16 @@
 """Match genotypes at k sites."""
+from typing import Optional
 
-import jax.numpy as np
+import numpy as np
+
+from .backend import array_module, asarray
 
 
 def get_indices_with_particular_states(
-    genotypes: np.ndarray, sites: np.ndarray, states: np.ndarray
+    genotypes: np.ndarray,
+    sites: np.ndarray,
+    states: np.ndarray,
+    backend: Optional[str] = None,
 ):
     """Get the indices of the genotypes that have desired states at k sites.
 
@@ -15,8 +21,13 @@ def get_indices_with_particular_states(
     :param states: The genotype states that should be matched.
         Should be of shape (k, n_genotype_states)
         and should be a one-hot encoding vector.
+    :param backend: One of `BACKENDS`, or None to use the global default.
     :return: The indices of the genotypes that satisfy the condition.
     """
-    has_genotypes = np.all(genotypes[:, sites, :] == states, axis=(1, 2))
-    indices = np.where(has_genotypes)[0]
+    xp = array_module(backend)
+    genotypes = asarray(genotypes, backend)
+    sites = asarray(sites, backend)
+    states = asarray(states, backend)
+    has_genotypes = xp.all(genotypes[:, sites, :] == states, axis=(1, 2))
+    indices = xp.where(has_genotypes)[0]
     return indices
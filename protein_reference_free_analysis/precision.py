@@ -0,0 +1,143 @@
+"""Precision policies for counts, accumulators and stored effects.
+
+A precision policy says which dtype is used for
+
+- `counts`: the number of genotypes carrying each (pair of) state(s),
+- `sums`: the phenotype sums and every intermediate average, and
+- `effects`: the effect tensors that are returned and stored,
+
+and whether phenotype sums are accumulated across chunks
+with compensated (Kahan-Babuska-Neumaier) summation.
+Compensated policies also cap the chunk size,
+even without a memory budget,
+since the sums within a chunk are not compensated.
+
+The policy can be chosen globally:
+
+```python
+from protein_reference_free_analysis.precision import set_precision
+
+set_precision("float16")
+```
+
+or per call, by passing `precision=` to any function that accepts it.
+Either a name from `PRECISIONS` or a `Precision` instance is accepted.
+
+JAX computes in 32 bits unless `jax_enable_x64` is set;
+64-bit dtypes requested on the `"jax"` backend then fall back to 32 bits
+and the policy is always compensated.
+"""
+from dataclasses import dataclass
+from typing import Optional, Union
+
+import numpy as np
+
+from .backend import resolve_backend
+
+
+@dataclass(frozen=True)
+class Precision:
+    """A precision policy.
+
+    :param counts: The dtype of genotype counts.
+    :param sums: The dtype of phenotype sums and averages.
+    :param effects: The dtype of returned effects.
+        None means the same as `sums`.
+    :param compensated: Whether to accumulate phenotype sums
+        across small chunks with compensated summation.
+    """
+
+    counts: str = "int32"
+    sums: str = "float64"
+    effects: Optional[str] = None
+    compensated: bool = False
+
+
+PRECISIONS = {
+    "default": Precision(),
+    "compensated": Precision(compensated=True),
+    "float32": Precision(sums="float32", effects="float32", compensated=True),
+    "float16": Precision(sums="float32", effects="float16", compensated=True),
+}
+
+_default_precision = PRECISIONS["default"]
+
+
+def set_precision(precision: Union[str, Precision]) -> None:
+    """Set the global default precision policy.
+
+    :param precision: A name from `PRECISIONS` or a `Precision` instance.
+    """
+    global _default_precision
+    _default_precision = _lookup_precision(precision)
+
+
+def get_precision() -> Precision:
+    """Get the global default precision policy.
+
+    :returns: The global default precision policy.
+    """
+    return _default_precision
+
+
+def resolve_precision(
+    precision: Union[None, str, Precision] = None, backend: Optional[str] = None
+) -> Precision:
+    """Resolve a precision policy for a backend.
+
+    :param precision: A name from `PRECISIONS`, a `Precision` instance,
+        or None to use the global default.
+    :param backend: One of `BACKENDS`, or None to use the global default.
+        Dtypes that the backend cannot represent are narrowed.
+    :returns: The precision policy to use, with `effects` filled in.
+    :raises ValueError: If `precision` is not a name in `PRECISIONS`.
+    """
+    if precision is None:
+        precision = _default_precision
+    precision = _lookup_precision(precision)
+
+    counts, sums = precision.counts, precision.sums
+    effects = precision.effects or sums
+    compensated = precision.compensated
+    if resolve_backend(backend) == "jax":
+        from jax import config
+
+        if not config.jax_enable_x64:
+            narrowed = [_narrow(dtype) for dtype in (counts, sums, effects)]
+            compensated = compensated or narrowed[1] != sums
+            counts, sums, effects = narrowed
+    return Precision(counts=counts, sums=sums, effects=effects, compensated=compensated)
+
+
+def _lookup_precision(precision: Union[str, Precision]) -> Precision:
+    """Look up a precision policy by name.
+
+    :param precision: A name from `PRECISIONS` or a `Precision` instance.
+    :returns: The precision policy.
+    :raises ValueError: If `precision` is not a name in `PRECISIONS`.
+    """
+    if isinstance(precision, Precision):
+        return precision
+    if precision not in PRECISIONS:
+        raise ValueError(
+            f"Unknown precision {precision!r}; expected one of {list(PRECISIONS)}."
+        )
+    return PRECISIONS[precision]
+
+
+def _narrow(dtype: str) -> str:
+    """Narrow a 64-bit dtype to its 32-bit counterpart.
+
+    :param dtype: The name of a dtype.
+    :returns: The name of the narrowed dtype.
+    """
+    return {"float64": "float32", "int64": "int32"}.get(dtype, dtype)
+
+
+def itemsize(dtype: str) -> int:
+    """Get the number of bytes per element of a dtype.
+
+    :param dtype: The name of a dtype.
+    :returns: The number of bytes per element.
+    """
+    return np.dtype(dtype).itemsize
@@ -1 +1,89 @@
 """Utilities for protein-reference-free-analysis."""
+import re
+from numbers import Real
+from typing import Optional, Union
+
+_MEMORY_UNITS = {
+    "": 1,
+    "B": 1,
+    "KB": 1000,
+    "MB": 1000**2,
+    "GB": 1000**3,
+    "TB": 1000**4,
+    "KIB": 1024,
+    "MIB": 1024**2,
+    "GIB": 1024**3,
+    "TIB": 1024**4,
+}
+
+
+def parse_memory(max_memory: Union[None, Real, str]) -> Optional[int]:
+    """Parse a memory budget into a number of bytes.
+
+    :param max_memory: A non-negative number of bytes,
+        a string such as `"32GB"`, `"512 MiB"` or `"1e9"`,
+        or None for no budget.
+    :returns: The number of bytes, or None for no budget.
+    :raises ValueError: If `max_memory` cannot be parsed.
+    """
+    if max_memory is None:
+        return None
+    if isinstance(max_memory, Real) and not isinstance(max_memory, bool):
+        number, unit = max_memory, ""
+    elif isinstance(max_memory, str):
+        match = re.fullmatch(
+            r"\s*([0-9]*\.?[0-9]+(?:[eE][+-]?[0-9]+)?)\s*([A-Za-z]*)\s*", max_memory
+        )
+        if match is None:
+            raise ValueError(f"Cannot parse memory budget {max_memory!r}.")
+        number, unit = float(match.group(1)), match.group(2)
+    else:
+        raise ValueError(f"Cannot parse memory budget {max_memory!r}.")
+    if unit.upper() not in _MEMORY_UNITS or not 0 <= number < float("inf"):
+        raise ValueError(f"Cannot parse memory budget {max_memory!r}.")
+    return int(number * _MEMORY_UNITS[unit.upper()])
+
+
+def check_memory(required_bytes: int, max_memory: Union[None, int, str] = None):
+    """Check that an allocation fits in a memory budget.
+
+    :param required_bytes: The number of bytes needed.
+    :param max_memory: The memory budget; see `parse_memory`.
+        None means there is no budget.
+    :raises MemoryError: If `required_bytes` exceeds the budget.
+    """
+    budget = parse_memory(max_memory)
+    if budget is not None and required_bytes > budget:
+        raise MemoryError(
+            f"A memory budget of {budget} bytes is too small: "
+            f"{required_bytes} bytes are needed."
+        )
+
+
+def chunk_size(
+    num_items: int,
+    bytes_per_item: int,
+    fixed_bytes: int = 0,
+    max_memory: Union[None, int, str] = None,
+) -> int:
+    """Choose how many items to process at once under a memory budget.
+
+    :param num_items: The total number of items.
+    :param bytes_per_item: The working memory needed per item in a chunk.
+    :param fixed_bytes: The memory needed regardless of the chunk size.
+    :param max_memory: The memory budget; see `parse_memory`.
+        None means all items are processed at once.
+    :returns: The number of items per chunk, at least 1.
+    :raises MemoryError: If not even a single item fits in the budget.
+    """
+    budget = parse_memory(max_memory)
+    if budget is None:
+        return max(num_items, 1)
+    available = budget - fixed_bytes
+    if available < bytes_per_item:
+        raise MemoryError(
+            f"A memory budget of {budget} bytes is too small: "
+            f"{fixed_bytes} bytes are needed up front "
+            f"and {bytes_per_item} bytes per item."
+        )
+    return max(min(num_items, available // bytes_per_item), 1)
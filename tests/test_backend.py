@@ -0,0 +1,50 @@
+"""Tests for the backend submodule."""
+import numpy as onp
+import pytest
+from scipy import sparse
+
+from protein_reference_free_analysis.backend import (
+    BACKENDS,
+    array_module,
+    design_matrix,
+    get_backend,
+    resolve_backend,
+    set_backend,
+)
+from protein_reference_free_analysis.genotype_generator import (
+    make_comprehensive_genotypes,
+)
+
+
+def test_set_backend():
+    """Test that the global default backend can be changed and restored."""
+    original = get_backend()
+    try:
+        set_backend("numpy")
+        assert get_backend() == "numpy"
+        assert resolve_backend() == "numpy"
+        assert array_module() is onp
+    finally:
+        set_backend(original)
+    assert get_backend() == original
+
+
+def test_resolve_backend_unknown():
+    """Test that an unknown backend name raises a ValueError."""
+    with pytest.raises(ValueError):
+        resolve_backend("torch")
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_design_matrix(backend):
+    """Test that the design matrix is a flattened copy of the genotypes.
+
+    :param backend: The backend to test.
+    """
+    genotypes = make_comprehensive_genotypes(num_sites=3, num_states=2, backend=backend)
+    X = design_matrix(genotypes, backend)
+    assert X.shape == (8, 6)
+    if backend == "numpy":
+        assert sparse.issparse(X)
+        X = X.toarray()
+    assert (onp.asarray(X) == onp.asarray(genotypes).reshape(8, 6)).all()
@@ -0,0 +1,16 @@
+"""Tests for the benchmark harness."""
+from protein_reference_free_analysis.backend import BACKENDS
+from protein_reference_free_analysis.benchmark import benchmark_backends
+
+
+def test_benchmark_backends():
+    """Test that every (size, estimator, backend) is timed and one is fastest."""
+    records = benchmark_backends(
+        num_sites=[2, 3], num_states=2, estimators=["first_order_effects"], repeats=1
+    )
+    assert len(records) == 2 * len(BACKENDS)
+    assert {record["num_genotypes"] for record in records} == {4, 8}
+    for num_sites in [2, 3]:
+        fastest = [r for r in records if r["num_sites"] == num_sites and r["fastest"]]
+        assert len(fastest) == 1
+    assert all(record["seconds"] >= 0 for record in records)
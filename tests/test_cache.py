@@ -0,0 +1,215 @@
+"""Tests for the cache submodule."""
+import jax.numpy as jnp
+import numpy as onp
+import pytest
+
+from protein_reference_free_analysis import cache as cache_module
+from protein_reference_free_analysis.cache import (
+    EffectCache,
+    fingerprint,
+    get_cache,
+    resolve_cache,
+    use_cache,
+)
+from protein_reference_free_analysis.effects import (
+    first_order_effects,
+    second_order_effects,
+)
+from protein_reference_free_analysis.genotype_generator import (
+    make_comprehensive_genotypes,
+)
+
+
+@pytest.fixture
+def dataset():
+    """Dataset fixture.
+
+    :returns: a comprehensive set of genotypes and random phenotypes.
+    """
+    genotypes = make_comprehensive_genotypes(num_sites=3, num_states=2, backend="numpy")
+    phenotypes = onp.random.default_rng(0).normal(size=len(genotypes))
+    return genotypes, phenotypes
+
+
+def test_fingerprint(dataset):
+    """Test that fingerprints depend on array content and options only.
+
+    :param dataset: The genotypes and phenotypes. Comes from the dataset() fixture.
+    """
+    genotypes, phenotypes = dataset
+    key = fingerprint(genotypes, phenotypes, backend="numpy")
+    assert key == fingerprint(genotypes.copy(), phenotypes.copy(), backend="numpy")
+    assert key != fingerprint(genotypes, phenotypes + 1, backend="numpy")
+    assert key != fingerprint(genotypes, phenotypes, backend="jax")
+    assert key != fingerprint(genotypes, phenotypes.astype("float32"), backend="numpy")
+
+
+@pytest.mark.parametrize("mutation", ["view", "writeable"])
+def test_mutated_inputs_are_recomputed(dataset, mutation):
+    """Test that mutating a read-only input in place gives fresh effects.
+
+    :param dataset: The genotypes and phenotypes. Comes from the dataset() fixture.
+    :param mutation: How the read-only phenotypes are mutated:
+        through a view taken before the flag was cleared,
+        or by making them writable again.
+    """
+    genotypes, phenotypes = dataset
+    view = phenotypes[:]
+    phenotypes.flags.writeable = False
+    cache = EffectCache()
+    first_order_effects(genotypes, phenotypes, backend="numpy", cache=cache)
+
+    if mutation == "view":
+        view[:] = onp.arange(len(view))
+    else:
+        phenotypes.flags.writeable = True
+        phenotypes[0] = 100
+    assert id(phenotypes) not in cache_module._array_digests
+    result = first_order_effects(genotypes, phenotypes, backend="numpy", cache=cache)
+    expected = first_order_effects(genotypes, phenotypes, backend="numpy", cache=False)
+    assert onp.array_equal(result, expected)
+
+
+def test_fingerprint_remembers_jax_arrays(dataset, monkeypatch):
+    """Test that JAX arrays are hashed once for as long as they live.
+
+    :param dataset: The genotypes and phenotypes. Comes from the dataset() fixture.
+    :param monkeypatch: Pytest's monkeypatch fixture.
+    """
+    genotypes, _ = dataset
+    array = jnp.asarray(genotypes)
+    key = fingerprint(array)
+    assert key == fingerprint(genotypes)
+    assert id(array) in cache_module._array_digests
+
+    # A remembered digest is not recomputed.
+    monkeypatch.setattr(onp, "ascontiguousarray", None)
+    assert fingerprint(array) == key
+    monkeypatch.undo()
+
+    array_id = id(array)
+    del array
+    assert array_id not in cache_module._array_digests
+
+
+def test_effect_cache_lru():
+    """Test that the least-recently-used entries are evicted first."""
+    cache = EffectCache(max_memory=2 * 80)
+    cache.put("a", (onp.zeros(10),))
+    cache.put("b", (onp.zeros(10),))
+    assert cache.get("a") is not None
+    cache.put("c", (onp.zeros(10),))
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.nbytes == 2 * 80
+
+
+def test_effect_cache_copies():
+    """Test that mutating a returned array does not corrupt the cache."""
+    cache = EffectCache()
+    cache.put("a", (onp.zeros(3),))
+    (array,) = cache.get("a")
+    array[:] = 1
+    assert (cache.get("a")[0] == 0).all()
+
+
+def test_effect_cache_disk(tmp_path):
+    """Test that on-disk entries are shared between cache instances.
+
+    :param tmp_path: A temporary directory. Comes from pytest.
+    """
+    key = fingerprint(onp.arange(3))
+    EffectCache(directory=tmp_path).put(key, (onp.arange(3), onp.ones((2, 2))))
+    cache = EffectCache(directory=tmp_path)
+    assert len(cache) == 0
+    first, second = cache.get(key)
+    assert (first == onp.arange(3)).all() and second.shape == (2, 2)
+    assert len(cache) == 1
+    cache.clear(disk=True)
+    assert key not in cache
+
+
+def test_effect_cache_clear_keeps_other_files(tmp_path):
+    """Test that clearing the disk tier only removes the cache's own entries.
+
+    :param tmp_path: A temporary directory. Comes from pytest.
+    """
+    onp.savez(tmp_path / "data.npz", onp.arange(3))
+    cache = EffectCache(directory=tmp_path)
+    cache.put(fingerprint(onp.arange(3)), (onp.arange(3),))
+    cache.clear(disk=True)
+    assert [path.name for path in tmp_path.iterdir()] == ["data.npz"]
+
+
+def test_effect_cache_failed_write(tmp_path, monkeypatch):
+    """Test that a failed write to disk leaves no temporary file behind.
+
+    :param tmp_path: A temporary directory. Comes from pytest.
+    :param monkeypatch: Pytest's monkeypatch fixture.
+    """
+
+    def savez(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(onp, "savez", savez)
+    cache = EffectCache(directory=tmp_path)
+    with pytest.raises(OSError):
+        cache.put("a", (onp.arange(3),))
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_resolve_cache():
+    """Test that None uses the global cache and False disables caching."""
+    cache = EffectCache()
+    assert resolve_cache(None) is get_cache()
+    assert resolve_cache(False) is None
+    assert resolve_cache(cache) is cache
+    with use_cache(None):
+        assert resolve_cache() is None
+    assert resolve_cache() is not None
+    assert resolve_cache(None, max_memory="1GB") is None
+    assert resolve_cache(cache, max_memory="1GB") is cache
+
+
+def test_max_memory_skips_default_cache(dataset):
+    """Test that calls with a memory budget do not fill the global cache.
+
+    :param dataset: The genotypes and phenotypes. Comes from the dataset() fixture.
+    """
+    genotypes, phenotypes = dataset
+    with use_cache(EffectCache()) as cache:
+        second_order_effects(genotypes, phenotypes, backend="numpy", max_memory="1GB")
+        assert len(cache) == 0
+        second_order_effects(genotypes, phenotypes, backend="numpy")
+        # The first- and second-order statistics and the effects.
+        assert len(cache) == 3
+
+
+@pytest.mark.parametrize("backend", ["jax", "numpy"])
+def test_effects_cached(dataset, backend):
+    """Test that repeated effect computations are served from the cache.
+
+    :param dataset: The genotypes and phenotypes. Comes from the dataset() fixture.
+    :param backend: The array backend to use.
+    """
+    genotypes, phenotypes = dataset
+    cache = EffectCache()
+    e_1 = first_order_effects(genotypes, phenotypes, backend=backend, cache=cache)
+    # The first-order statistics and effects.
+    assert len(cache) == 2
+    e_2 = second_order_effects(genotypes, phenotypes, backend=backend, cache=cache)
+    # Reuses the first-order statistics; adds second-order statistics and effects.
+    assert len(cache) == 4
+
+    e_2_cached = second_order_effects(
+        genotypes, phenotypes, backend=backend, cache=cache
+    )
+    assert len(cache) == 4
+    assert type(e_2_cached) is type(e_2)
+    assert onp.array_equal(e_2_cached, e_2)
+    assert onp.array_equal(
+        first_order_effects(genotypes, phenotypes, backend=backend, cache=cache), e_1
+    )
+    assert onp.array_equal(
+        second_order_effects(genotypes, phenotypes, backend=backend, cache=False), e_2
+    )
@@ -1,9 +1,14 @@
 """Tests for Nth order effects."""
+import tracemalloc
+
 import jax.numpy as np
+import numpy as onp
 import pytest
 from jax import random
 
+from protein_reference_free_analysis.backend import BACKENDS
 from protein_reference_free_analysis.effects import (
+    calculate_double_genotype_averages,
     calculate_single_genotype_averages,
     first_order_effects,
     second_order_effects,
@@ -12,6 +17,7 @@ from protein_reference_free_analysis.effects import (
 from protein_reference_free_analysis.genotype_generator import (
     make_comprehensive_genotypes,
 )
+from protein_reference_free_analysis.utils import parse_memory
 
 
 @pytest.fixture
@@ -87,3 +93,130 @@ def test_second_order_effects(genotypes, seed):
     second_order_fx = second_order_effects(genotypes, phenotypes)
     assert second_order_fx.shape == expected_shape
     assert np.isclose(second_order_fx.sum(), 0, atol=1e-6)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_second_order_effects_backend(genotypes, backend):
+    """Test that second-order effects are correct on every backend.
+
+    :param genotypes: The genotypes to test. Comes from the genotypes() fixture.
+    :param backend: The backend to test.
+    """
+    _, num_sites, num_states = genotypes.shape
+    phenotypes = random.normal(random.PRNGKey(0), (num_states**num_sites,))
+    second_order_fx = second_order_effects(genotypes, phenotypes, backend=backend)
+    assert second_order_fx.shape == (num_sites, num_states, num_sites, num_states)
+    assert np.isclose(second_order_fx.sum(), 0, atol=1e-6)
+
+
+def test_backends_agree(genotypes):
+    """Test that the JAX and NumPy backends return the same effects.
+
+    :param genotypes: The genotypes to test. Comes from the genotypes() fixture.
+    """
+    phenotypes = random.normal(random.PRNGKey(0), (len(genotypes),))
+    for estimator in [
+        zeroth_order_effects,
+        first_order_effects,
+        calculate_double_genotype_averages,
+        second_order_effects,
+    ]:
+        jax_result = estimator(genotypes, phenotypes, backend="jax")
+        numpy_result = estimator(genotypes, phenotypes, backend="numpy")
+        assert isinstance(numpy_result, (onp.ndarray, onp.floating))
+        assert onp.allclose(jax_result, numpy_result, atol=1e-5)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("precision", ["default", "compensated", "float32"])
+def test_second_order_effects_max_memory(backend, precision):
+    """Test that chunking under a memory budget does not change the effects.
+
+    :param backend: The backend to test.
+    :param precision: The precision policy to test.
+    """
+    genotypes = make_comprehensive_genotypes(num_sites=4, num_states=3)
+    phenotypes = random.normal(random.PRNGKey(0), (len(genotypes),))
+    expected = second_order_effects(
+        genotypes, phenotypes, backend, precision, cache=False
+    )
+    # Small enough to process the 81 genotypes in several chunks.
+    result = second_order_effects(
+        genotypes, phenotypes, backend, precision, max_memory=80_000, cache=False
+    )
+    assert result.dtype == expected.dtype
+    assert onp.allclose(result, expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_effects_float16(genotypes, backend):
+    """Test that the float16 policy stores effects in half precision.
+
+    :param genotypes: The genotypes to test. Comes from the genotypes() fixture.
+    :param backend: The backend to test.
+    """
+    phenotypes = random.normal(random.PRNGKey(0), (len(genotypes),))
+    expected = second_order_effects(genotypes, phenotypes, backend)
+    result = second_order_effects(genotypes, phenotypes, backend, "float16")
+    assert result.dtype == onp.float16
+    assert onp.allclose(result, expected, atol=1e-2)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("precision", ["compensated", "float32", "float16"])
+def test_effects_large_offset(backend, precision):
+    """Test that compensated policies stay accurate without a memory budget.
+
+    Phenotypes with a large offset lose their low-order digits
+    when summed in 32 bits one genotype at a time.
+
+    :param backend: The backend to test.
+    :param precision: The precision policy to test.
+    """
+    rng = onp.random.default_rng(0)
+    genotypes = onp.eye(2, dtype=onp.int8)[rng.integers(0, 2, size=(200_000, 3))]
+    phenotypes = 1e4 + rng.normal(size=len(genotypes))
+    for estimator in (first_order_effects, second_order_effects):
+        expected = estimator(genotypes, phenotypes, "numpy", "default", cache=False)
+        result = estimator(genotypes, phenotypes, backend, precision, cache=False)
+        assert onp.allclose(result, expected, atol=1e-2, equal_nan=True)
+
+
+@pytest.mark.parametrize("precision", ["default", "compensated", "float16"])
+@pytest.mark.parametrize("max_memory", ["250KB", "2MB"])
+def test_second_order_effects_peak_memory(precision, max_memory):
+    """Test that the peak memory of second-order effects stays within budget.
+
+    Peak memory is measured with tracemalloc, so only the NumPy backend is tested.
+
+    :param precision: The precision policy to test.
+    :param max_memory: The memory budget.
+    """
+    rng = onp.random.default_rng(0)
+    genotypes = onp.eye(4, dtype=onp.int8)[rng.integers(0, 4, size=(2000, 10))]
+    phenotypes = rng.normal(size=len(genotypes))
+
+    def run():
+        return second_order_effects(
+            genotypes, phenotypes, "numpy", precision, max_memory, cache=False
+        )
+
+    # Warm up NumPy's and SciPy's one-off allocations.
+    run()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak <= parse_memory(max_memory)
+
+
+def test_second_order_effects_memory_error(genotypes):
+    """Test that a budget too small for the effect tensor raises a MemoryError.
+
+    :param genotypes: The genotypes to test. Comes from the genotypes() fixture.
+    """
+    phenotypes = onp.ones(len(genotypes))
+    with pytest.raises(MemoryError):
+        second_order_effects(genotypes, phenotypes, "numpy", max_memory=100)
@@ -1,6 +1,8 @@
 """Integration test for the overall model."""
+import tracemalloc
 from functools import partial
 
+import numpy as onp
 import pytest
 from jax import numpy as np
 from jax import random, vmap
@@ -22,6 +24,7 @@ from protein_reference_free_analysis.phenotype_generator import (
     count_kth_genotype,
     random_phenotype,
 )
+from protein_reference_free_analysis.utils import parse_memory
 
 
 @pytest.mark.parametrize("k", [0, 1, 2])
@@ -89,12 +92,15 @@ def test_overall_model_random_genotype(seed, num_states, num_sites):
     assert np.corrcoef(recalculated_phenotypes, phenotypes)[0, 1] > 0
 
 
-def test_overall_model_with_random_effects():
+@pytest.mark.parametrize("backend", ["jax", "numpy"])
+def test_overall_model_with_random_effects(backend):
     """Test that the overall model works as expected with random effects.
 
     This test asserts that even when the inferred effects
     are different from the randomly-generated effects,
     we still calculate the correct phenotypes.
+
+    :param backend: The array backend used to infer effects.
     """
     key = random.PRNGKey(0)
     k1, k2, k3 = random.split(key, 3)
@@ -107,12 +113,76 @@ def test_overall_model_with_random_effects():
     phenotypes_true = calculate_phenotypes(e_0, e_1, e_2, genotypes)
 
     # Now, infer the effects from genotype-phenotype.
-    e_0_est = zeroth_order_effects(genotypes, phenotypes_true)
-    e_1_est = first_order_effects(genotypes, phenotypes_true)
-    e_2_est = second_order_effects(genotypes, phenotypes_true)
+    e_0_est = zeroth_order_effects(genotypes, phenotypes_true, backend=backend)
+    e_1_est = first_order_effects(genotypes, phenotypes_true, backend=backend)
+    e_2_est = second_order_effects(genotypes, phenotypes_true, backend=backend)
 
     # Finally, re-calculate phenotypes
-    phenotypes_est = calculate_phenotypes(e_0_est, e_1_est, e_2_est, genotypes)
+    phenotypes_est = calculate_phenotypes(
+        e_0_est, e_1_est, e_2_est, genotypes, backend=backend
+    )
 
     # Check #1: phenotypes_true and phenotypes_est should be the same.
     assert np.allclose(phenotypes_est, phenotypes_true, atol=1e-5)
+
+
+@pytest.mark.parametrize("backend", ["jax", "numpy"])
+def test_overall_model_max_memory(backend):
+    """Test that prediction under a memory budget matches unchunked prediction.
+
+    :param backend: The array backend to use.
+    """
+    key = random.PRNGKey(0)
+    k1, k2, k3 = random.split(key, 3)
+    genotypes = make_comprehensive_genotypes(num_sites=4, num_states=3)
+    e_0 = random.normal(k1)
+    e_1 = random_first_order_effects(genotypes, k2)
+    e_2 = random_second_order_effects(genotypes, k3)
+
+    expected = calculate_phenotypes(e_0, e_1, e_2, genotypes, backend=backend)
+    # Small enough to process the 81 genotypes in several chunks.
+    result = calculate_phenotypes(
+        e_0, e_1, e_2, genotypes, backend=backend, max_memory="80KB"
+    )
+    assert result.shape == (len(genotypes),)
+    assert result.dtype == expected.dtype
+    assert np.allclose(result, expected, atol=1e-5)
+    if backend == "numpy":
+        # A JAX e_0 must not turn the NumPy result into a JAX float32 array.
+        assert isinstance(result, onp.ndarray)
+        assert result.dtype == onp.float64
+
+
+@pytest.mark.parametrize("precision", ["default", "float32"])
+@pytest.mark.parametrize("max_memory", ["2MB", "8MB"])
+def test_calculate_phenotypes_peak_memory(precision, max_memory):
+    """Test that the peak memory of prediction stays within budget.
+
+    Peak memory is measured with tracemalloc, so only the NumPy backend is tested.
+    The effects are float16, so converting them is part of the budget.
+
+    :param precision: The precision policy to use.
+    :param max_memory: The memory budget.
+    """
+    rng = onp.random.default_rng(0)
+    num_sites, num_states = 20, 20
+    genotypes = onp.eye(num_states, dtype=onp.int8)[
+        rng.integers(0, num_states, size=(4000, num_sites))
+    ]
+    e_1 = rng.normal(size=(num_sites, num_states)).astype("float16")
+    e_2 = rng.normal(size=(num_sites, num_states) * 2).astype("float16")
+
+    def run():
+        return calculate_phenotypes(
+            0.5, e_1, e_2, genotypes, "numpy", precision, max_memory
+        )
+
+    # Warm up NumPy's one-off allocations.
+    run()
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak <= parse_memory(max_memory)
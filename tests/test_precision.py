@@ -0,0 +1,50 @@
+"""Tests for the precision submodule."""
+import pytest
+
+from protein_reference_free_analysis.precision import (
+    PRECISIONS,
+    Precision,
+    get_precision,
+    itemsize,
+    resolve_precision,
+    set_precision,
+)
+
+
+def test_set_precision():
+    """Test that the global default precision can be changed and restored."""
+    original = get_precision()
+    try:
+        set_precision("float16")
+        assert get_precision().effects == "float16"
+        assert resolve_precision().sums == "float32"
+    finally:
+        set_precision(original)
+    assert get_precision() == original
+
+
+def test_resolve_precision():
+    """Test that precision policies are resolved from names and instances."""
+    assert resolve_precision("default", backend="numpy").effects == "float64"
+    assert resolve_precision(Precision(counts="int64"), "numpy").counts == "int64"
+    with pytest.raises(ValueError):
+        resolve_precision("float8")
+
+
+def test_resolve_precision_jax():
+    """Test that 64-bit dtypes are narrowed and compensated on 32-bit JAX."""
+    from jax import config
+
+    precision = resolve_precision(PRECISIONS["default"], backend="jax")
+    if config.jax_enable_x64:
+        assert precision.sums == "float64"
+    else:
+        assert precision.sums == "float32"
+        assert precision.counts == "int32"
+        assert precision.compensated
+
+
+def test_itemsize():
+    """Test the number of bytes per element of a dtype."""
+    assert itemsize("float16") == 2
+    assert itemsize("int32") == 4
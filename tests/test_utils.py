@@ -0,0 +1,49 @@
+"""Tests for protein-reference-free-analysis's utilities."""
+import numpy as np
+import pytest
+
+from protein_reference_free_analysis.utils import chunk_size, parse_memory
+
+
+@pytest.mark.parametrize(
+    "max_memory, expected",
+    [
+        (None, None),
+        (1024, 1024),
+        ("32GB", 32 * 1000**3),
+        ("1.5 KiB", 1536),
+        ("512mb", 512 * 1000**2),
+        (32e9, 32 * 1000**3),
+        (np.int64(1000), 1000),
+        ("1e9", 1000**3),
+        ("2.5e3 KB", 2_500_000),
+    ],
+)
+def test_parse_memory(max_memory, expected):
+    """Test that memory budgets are parsed into bytes.
+
+    :param max_memory: The memory budget.
+    :param expected: The expected number of bytes.
+    """
+    assert parse_memory(max_memory) == expected
+
+
+@pytest.mark.parametrize(
+    "max_memory", ["a lot", "-5GB", "5 XB", -1, float("nan"), True, [1]]
+)
+def test_parse_memory_invalid(max_memory):
+    """Test that an unparseable memory budget raises a ValueError.
+
+    :param max_memory: The memory budget.
+    """
+    with pytest.raises(ValueError):
+        parse_memory(max_memory)
+
+
+def test_chunk_size():
+    """Test that chunk sizes respect the memory budget."""
+    assert chunk_size(100, bytes_per_item=10) == 100
+    assert chunk_size(100, bytes_per_item=10, fixed_bytes=50, max_memory=150) == 10
+    assert chunk_size(5, bytes_per_item=10, max_memory=1000) == 5
+    with pytest.raises(MemoryError):
+        chunk_size(100, bytes_per_item=10, fixed_bytes=50, max_memory=55)